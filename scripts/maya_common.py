@@ -8,6 +8,12 @@ _HAS_LAYER_TOKEN_RE = re.compile(r'.*%l.*|.*<layer>.*|.*<renderlayer>.*', re.IGN
 _SUBSTITUTE_LAYER_TOKEN_RE = re.compile(r'%l|<layer>|<renderlayer>', re.IGNORECASE)
 _SUBSTITUTE_CAMERA_TOKEN_RE = re.compile(r'%c|<camera>', re.IGNORECASE)
 _SUBSTITUTE_SCENE_TOKEN_RE = re.compile(r'%s|<scene>', re.IGNORECASE)
+# All of the above plus the version token in one regex, with the matched
+# token kind as group name.
+_SUBSTITUTE_FILE_PREFIX_TOKEN_RE = re.compile(
+    r'(?P<scene>%s|<scene>)|(?P<layer>%l|<layer>|<renderlayer>)|(?P<camera>%c|<camera>)'
+    r'|(?P<version>%v|<version>)',
+    re.IGNORECASE)
 
 class MayaZyncException(Exception):
   pass
@@ -11,6 +11,14 @@ import maya.mel
 
 import maya_common
 
+# Patterns of paths referenced from RIB archives, with the type of the file.
+# Please see the link to easily see what those regex match: https://regex101.com/r/X1hBUJ/1
+_RIB_ARCHIVE_FILE_RES = [
+    (re.compile(r'\"((?:(?!\").)*?\.rib)\"'), 'rib'),
+    (re.compile(r'\"string fileTextureName\" \[\"((?:(?!\").)*?)\"'), 'tex'),
+    (re.compile(r'\"string lightColorMap\" \[\"((?:(?!\").)*?)\"'), 'tex'),
+    (re.compile(r'\"string filename\" \[\"((?:(?!\").)*?)\"'), 'tex')]
+
 
 class RendermanPre22Api(object):
   def get_version(self):
@@ -102,12 +110,12 @@ class Renderman(object):
     expandedPath = expandedPath.replace('<f3>', '*')
     expandedPath = expandedPath.replace('<f4>', '*')
 
-    expandedPath = re.sub(maya_common._SUBSTITUTE_CAMERA_TOKEN_RE, self.camera, expandedPath)
+    expandedPath = maya_common._SUBSTITUTE_CAMERA_TOKEN_RE.sub(self.camera, expandedPath)
 
     allPaths = []
-    if re.match(maya_common._HAS_LAYER_TOKEN_RE, expandedPath):
+    if maya_common._HAS_LAYER_TOKEN_RE.match(expandedPath):
       for layer in self.layers_to_render:
-        allPaths.append(re.sub(maya_common._SUBSTITUTE_LAYER_TOKEN_RE, layer, expandedPath))
+        allPaths.append(maya_common._SUBSTITUTE_LAYER_TOKEN_RE.sub(layer, expandedPath))
     else:
       allPaths.append(expandedPath)
 
@@ -168,18 +176,18 @@ class Renderman(object):
        We also check if the user has cancelled."""
 
     fileSet = set()
+    # Archives tend to reference the same files many times, only check each
+    # path on disk once.
+    pathExists = {}
 
-    # Please see the link to easily see what those regex match: https://regex101.com/r/X1hBUJ/1
-    patterns = [(r'\"((?:(?!\").)*?\.rib)\"', 'rib'),
-                (r'\"string fileTextureName\" \[\"((?:(?!\").)*?)\"', 'tex'),
-                (r'\"string lightColorMap\" \[\"((?:(?!\").)*?)\"', 'tex'),
-                (r'\"string filename\" \[\"((?:(?!\").)*?)\"', 'tex')]
     with open(ribArchivePath, 'r') as content_file:
       line = content_file.readline(10000)
       while line != '' and not cmds.progressWindow(query=1, isCancelled=1):
-        for (pattern, t) in patterns:
-          for file in re.findall(pattern, line):
-            if os.path.exists(file):
+        for (pattern_re, t) in _RIB_ARCHIVE_FILE_RES:
+          for file in pattern_re.findall(line):
+            if file not in pathExists:
+              pathExists[file] = os.path.exists(file)
+            if pathExists[file]:
               fileSet.add((file, t))
         line = content_file.readline(10000)
 
@@ -213,7 +221,7 @@ class Renderman(object):
     """Handles PxrTexture nodes"""
     filename = cmds.getAttr('%s.filename' % node)
     if cmds.getAttr('%s.atlasStyle' % node) != 0:
-      filename = re.sub('_MAPID_', '*', filename)
+      filename = filename.replace('_MAPID_', '*')
     for expandedPath in self.generate_files_from_tokenized_path(filename):
       yield expandedPath
 
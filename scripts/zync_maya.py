@@ -18,15 +18,18 @@ __version__ = '1.5.13'
 
 
 import base64
-import copy
+import contextlib
 import functools
 import glob
 import itertools
+import json
 import math
 import os
 import re
 import string
 import sys
+import threading
+import time
 import traceback
 import types
 import webbrowser
@@ -50,6 +53,10 @@ RENDERER_NAMES = {
     'redshift': 'Redshift',
 }
 
+# Renderer menu labels mapped back to renderer names.
+_RENDERERS_BY_LABEL = dict((label, renderer) for renderer, label in RENDERER_NAMES.iteritems())
+_RENDERERS_BY_LABEL[RENDER_LABEL_VRAY_CUDA] = 'vray'
+
 TOKEN_TO_PATTERN_MAP = {
     '<f>': '<f>',
     '<layer>': '<layer>',
@@ -130,6 +137,16 @@ def import_zync_python():
 UI_FILE = '%s/resources/submit_dialog.ui' % (os.path.dirname(__file__),)
 
 _VERSION_CHECK_RESULT = None
+# Result of the version check is also stored on disk, so it doesn't need to
+# be repeated on every Maya launch.
+_VERSION_CHECK_CACHE_FILE = os.path.join(
+    os.path.expanduser('~'), '.zync', 'maya_version_check.json')
+_VERSION_CHECK_CACHE_TTL = 3600  # seconds
+# EULA acceptance confirmed by Zync is recorded on disk, so it doesn't need to
+# be verified on every submission.
+_EULA_ACCEPTANCE_CACHE_FILE = os.path.join(
+    os.path.expanduser('~'), '.zync', 'maya_eula_acceptance.json')
+_EULA_ACCEPTANCE_CACHE_TTL = 7 * 24 * 3600  # seconds
 
 # a list of Xgen attributes which contain filenames we should include for upload
 _XGEN_FILE_ATTRS = [
@@ -144,15 +161,44 @@ _SINGLE_FRAME_RE = re.compile(r'^(-?)\d+$')
 # A contiguous range of frames, e.g. 1-5, -3-2
 _FRAME_RANGE_RE = re.compile(r'^(?P<sf>(-?)\d+)-(?P<ef>(-?)\d+)$')
 
+# Regex for finding <attr:...> tokens in a file path.
+_ATTR_TOKEN_RE = re.compile(r'<attr:.*?>', re.IGNORECASE)
+# Regex for checking that a glob path contains more than wildcards and slashes.
+_NON_WILDCARD_RE = re.compile(r'[^/*]')
+
 # Regex for finding a frame number in a file path.
 _FRAME_NUMBER_RE = re.compile(r'.+\.(?P<frame>[0-9]+)\..+')
 
+# Regexes used by seq_to_glob to turn sequence paths into glob patterns.
+_MESHITEM_TOKEN_RE = re.compile('<meshitem>', re.IGNORECASE)
+# Frame hash tokens, grouped so splitting with it keeps the tokens.
+_FRAME_HASHES_RE = re.compile('(#+)')
+# The last run of digits in a file name, i.e. one followed only by non-digits.
+_LAST_DIGITS_RE = re.compile(r'\d+(?=\D*$)')
+# Compiled TOKEN_TO_PATTERN_MAP, as (token, regex) pairs. Tokens with no
+# pattern are left out.
+_TOKEN_PATTERN_RES = [(token, re.compile(pattern, re.IGNORECASE))
+                      for token, pattern in TOKEN_TO_PATTERN_MAP.iteritems()
+                      if pattern is not None]
+
+# Regex for splitting the "files" attribute of an Xgen object into
+# whitespace/comma separated items, keeping quoted strings whole.
+_XGEN_FILES_ATTR_ITEM_RE = re.compile(r'(?:[^\s,"]|"(?:\\.|[^"])*")+')
+
 # Regex string for checking if string contains a layer token.
 _HAS_LAYER_TOKEN_RE = re.compile(r'.*%l.*|.*<layer>.*|.*<renderlayer>.*', re.IGNORECASE)
 _SUBSTITUTE_LAYER_TOKEN_RE = re.compile(r'%l|<layer>|<renderlayer>', re.IGNORECASE)
 _SUBSTITUTE_CAMERA_TOKEN_RE = re.compile(r'%c|<camera>', re.IGNORECASE)
 _SUBSTITUTE_SCENE_TOKEN_RE = re.compile(r'%s|<scene>', re.IGNORECASE)
 
+# Wildcards matching attributes which may hold the name of a V-Ray render
+# element.
+_VRAY_RENDER_ELEMENT_NAME_ATTRS = ['vray_filename*', 'vray_name*', 'vray_explicit_name*']
+
+# Reference nodes Maya creates for its own bookkeeping, which don't belong to a
+# referenced file.
+_NON_FILE_REFERENCE_NODES = ('sharedReferenceNode', '_UNKNOWN_REF_NODE_')
+
 # Pairs of attributes which define possible Bifrost cache locations.
 _BIFROST_CACHE_PATH_ATTRS = (
   ('guideCachePath', 'guideCacheFileName'),
@@ -210,12 +256,12 @@ def frame_range():
 
 def get_render_layers():
   """Get a list of all render layers in the scene."""
-  layers = []
   try:
+    # ls returns layer names interleaved with their namespaces, keep only the
+    # layers in the root namespace.
     all_layers = cmds.ls(type='renderLayer', showNamespace=True)
-    for i in range(0, len(all_layers), 2):
-      if all_layers[i+1] == ':':
-        layers.append(all_layers[i])
+    layers = [layer for layer, namespace in zip(all_layers[0::2], all_layers[1::2])
+              if namespace == ':']
   except Exception:
     layers = cmds.ls(type='renderLayer')
   return layers
@@ -224,13 +270,17 @@ def get_render_layers():
 def udim_range():
   bake_sets = list(bake_set for bake_set in cmds.ls(type='VRayBakeOptions') \
     if bake_set != 'vrayDefaultBakeOptions')
+  # Several bake sets often share a mesh, UV bounds of each mesh only need to
+  # be evaluated once.
+  baked_objects = set()
+  for bake_set in bake_sets:
+    baked_object = _get_bake_set_object(bake_set)
+    if baked_object is not None:
+      baked_objects.add(baked_object)
   u_max = 0
   v_max = 0
-  for bake_set in bake_sets:
-    conn_list = cmds.listConnections(bake_set)
-    if conn_list == None or len(conn_list) == 0:
-      continue
-    uv_info = cmds.polyEvaluate(conn_list[0], b2=True)
+  for baked_object in baked_objects:
+    uv_info = cmds.polyEvaluate(baked_object, b2=True)
     if uv_info[0][1] > u_max:
       u_max = int(math.ceil(uv_info[0][1]))
     if uv_info[1][1] > v_max:
@@ -256,24 +306,23 @@ def seq_to_glob(in_path):
   if in_path is None:
     return in_path
   in_path = _replace_attr_tokens(in_path)
-  in_path = re.sub('<meshitem>', '*', in_path, flags=re.IGNORECASE)
+  in_path = _MESHITEM_TOKEN_RE.sub('*', in_path)
 
   found_token = False
   if '#' in in_path:
-    in_path = re.sub('#+', '*', in_path, flags=re.IGNORECASE)
+    in_path = _FRAME_HASHES_RE.sub('*', in_path)
     found_token = True
-  for token in TOKEN_TO_PATTERN_MAP:
-    if token in in_path.lower() and TOKEN_TO_PATTERN_MAP[token] is not None:
-      in_path = re.sub(TOKEN_TO_PATTERN_MAP[token], '*', in_path, flags=re.IGNORECASE)
+  for token, pattern_re in _TOKEN_PATTERN_RES:
+    if token in in_path.lower():
+      in_path = pattern_re.sub('*', in_path)
       found_token = True
   if found_token:
     return in_path
 
   head = os.path.dirname(in_path)
   base = os.path.basename(in_path)
-  matches = list(re.finditer(r'\d+', base))
-  if matches:
-    match = matches[-1]
+  match = _LAST_DIGITS_RE.search(base)
+  if match:
     new_base = '%s*%s' % (base[:match.start()], base[match.end():])
     return '%s/%s' % (head, new_base)
   else:
@@ -283,8 +332,8 @@ def seq_to_glob(in_path):
 def _replace_attr_tokens(path):
   if not path:
     return path
-  glob_path = re.sub(r'<attr:.*?>', '*', path, flags=re.IGNORECASE)
-  if not re.search(r'[^/*]', glob_path):
+  glob_path = _ATTR_TOKEN_RE.sub('*', path)
+  if not _NON_WILDCARD_RE.search(glob_path):
     raise maya_common.MayaZyncException(
         'A file path using attr: tags resolved to %s, which is too wide. '
         'Please use attr: tags only for portions of the file path to limit the '
@@ -305,22 +354,26 @@ def get_file_node_path(node):
   if cmds.attributeQuery('computedFileTextureNamePattern', node=node, exists=True):
     textureNamePattern = cmds.getAttr('%s.computedFileTextureNamePattern' % node)
     if any(token in textureNamePattern.lower() for token in TOKEN_TO_PATTERN_MAP):
-      return cmds.getAttr('%s.computedFileTextureNamePattern' % node)
+      return textureNamePattern
   # otherwise use fileTextureName
   return cmds.getAttr('%s.fileTextureName' % node)
 
 
-def node_uses_image_sequence(node):
+def node_uses_image_sequence(node, node_path=None):
   """Determine if a node uses an image sequence or just a single image,
   not always obvious from its file path alone.
   Args:
     node: str, name of the Maya node
+    node_path: str, file path of the node as returned by get_file_node_path,
+               if the caller already has it
   Returns:
     bool, True if node uses an image sequence
   """
   # useFrameExtension indicates an explicit image sequence
   # a <UDIM> token implies a sequence
-  node_path = get_file_node_path(node).lower()
+  if node_path is None:
+    node_path = get_file_node_path(node)
+  node_path = node_path.lower()
   return (cmds.getAttr('%s.useFrameExtension' % node) == True or
       any(token in node_path for token in TOKEN_TO_PATTERN_MAP))
 
@@ -354,26 +407,37 @@ def _get_layer_overrides(attr):
           yield cmds.getAttr(attr_name)
 
 
-def _file_handler(node):
+def _arnold_uses_tx_files():
+  """Whether Arnold is set to use existing .tx versions of textures."""
+  try:
+    return bool(cmds.getAttr('defaultArnoldRenderOptions.use_existing_tiled_textures'))
+  except:
+    return False
+
+
+def _file_handler(arnold_use_tx, node):
   """Returns the file referenced by a Maya file node. Returned files may
   contain wildcards when they reference image sequences, for example an
-  animated texture node, or a path containing <UDIM> token."""
+  animated texture node, or a path containing <UDIM> token.
+
+  Args:
+    arnold_use_tx: bool, result of _arnold_uses_tx_files, looked up once for
+                   all file nodes
+    node: str, name of the file node
+  """
   texture_path = get_file_node_path(node)
   # if the node is an image sequence, transform the path into a
   # glob-style path, i.e. using * in place of any sequence number
   # or token. this will match what's provided via the file list
   # in the job's scene_info, so we can properly path swap
-  if node_uses_image_sequence(node):
+  if node_uses_image_sequence(node, texture_path):
     texture_path = seq_to_glob(texture_path)
   yield texture_path
   # if the Arnold "Use .tx" flag is on, look for a .tx version
   # of the texture as well
-  try:
-    if cmds.getAttr('defaultArnoldRenderOptions.use_existing_tiled_textures'):
-      head, _ = os.path.splitext(texture_path)
-      yield '%s.tx' % head
-  except:
-    pass
+  if arnold_use_tx and texture_path:
+    head, _ = os.path.splitext(texture_path)
+    yield '%s.tx' % head
   # look for layer overrides set on the path
   for override_path in _get_layer_overrides('%s.fileTextureName' % node):
     yield override_path
@@ -432,11 +496,16 @@ def _gpu_handler(node):
   yield cmds.getAttr('%s.cacheFileName' % node)
 
 
-def _mrOptions_handler(node):
-  """Handles mentalrayOptions nodes, for Final Gather"""
+def _mrOptions_handler(project_dir, node):
+  """Handles mentalrayOptions nodes, for Final Gather.
+
+  Args:
+    project_dir: str, root directory of the current project
+    node: str, name of the mentalrayOptions node
+  """
   mapName = cmds.getAttr('%s.finalGatherFilename' % node).strip()
   if mapName != "":
-    path = cmds.workspace(q=True, rd=True)
+    path = project_dir
     if path[-1] != "/":
       path += "/"
     path += "renderData/mentalray/finalgMap/"
@@ -461,23 +530,26 @@ def _vrSettings_handler(node):
   """Handles VRaySettingsNode nodes, for irradiance map"""
   irmap = cmds.getAttr('%s.ifile' % node)
   if cmds.getAttr('%s.imode' % node) == 7:
-    if irmap.find('.') == -1:
-      irmap += '*'
+    head, dot, ext = irmap.rpartition('.')
+    if dot:
+      irmap = '%s*.%s' % (head, ext)
     else:
-      last_dot = irmap.rfind('.')
-      irmap = '%s*%s' % (irmap[:last_dot], irmap[last_dot:])
+      irmap += '*'
   yield irmap
   yield cmds.getAttr('%s.fnm' % node)
 
 
-def _particle_handler(node):
-  project_dir = cmds.workspace(q=True, rd=True)
+def _particle_handler(project_dir, scene_file, node):
+  """Handles particle nodes, for particle disk caches.
+
+  Args:
+    project_dir: str, root directory of the current project
+    scene_file: str, path of the current scene file
+    node: str, name of the particle node
+  """
   if project_dir[-1] == '/':
     project_dir = project_dir[:-1]
-  if node.find('|') == -1:
-    node_base = node
-  else:
-    node_base = node.split('|')[-1]
+  node_base = node.rpartition('|')[2]
   path = None
   try:
     startup_cache = cmds.getAttr('%s.scp' % (node,)).strip()
@@ -488,7 +560,7 @@ def _particle_handler(node):
   except:
     path = None
   if path == None:
-    scene_base, ext = os.path.splitext(os.path.basename(cmds.file(q=True, loc=True)))
+    scene_base, ext = os.path.splitext(os.path.basename(scene_file))
     path = '%s/particles/%s/%s*' % (project_dir, scene_base, node_base)
   yield path
 
@@ -503,8 +575,8 @@ def _fur_handler(node):
   #
   #  Find all "Map" attributes and see if they have stored file paths.
   #
-  for attr in cmds.listAttr(node):
-    if attr.find('Map') != -1 and cmds.attributeQuery(attr, node=node, at=True) == 'typed':
+  for attr in cmds.listAttr(node, string='*Map*') or []:
+    if cmds.attributeQuery(attr, node=node, at=True) == 'typed':
       index_list = ['0', '1']
       for index in index_list:
         try:
@@ -550,9 +622,13 @@ def _mesh_handler(node):
       pass
 
 
-def _dynGlobals_handler(node):
-  """Handles dynGlobals nodes"""
-  project_dir = cmds.workspace(q=True, rd=True)
+def _dynGlobals_handler(project_dir, node):
+  """Handles dynGlobals nodes.
+
+  Args:
+    project_dir: str, root directory of the current project
+    node: str, name of the dynGlobals node
+  """
   if project_dir[-1] == '/':
     project_dir = project_dir[:-1]
   cache_dir = cmds.getAttr('%s.cd' % (node,))
@@ -702,7 +778,7 @@ def replace_frame_number(path, frame_number):
     raise ValueError("Frame number must be non-negative")
 
   def split_by_token(_path):
-    return re.split('(#+)', _path)
+    return _FRAME_HASHES_RE.split(_path)
 
   def is_token(_part):
     return '#' in _part
@@ -724,7 +800,18 @@ def replace_frame_number(path, frame_number):
   return final_path
 
 
-def get_scene_files(frames_to_render, renderer):
+def get_scene_files(frames_to_render, renderer, xgen_files=None):
+  """Returns all file dependencies of the scene.
+
+  Args:
+    frames_to_render: [int], list of each frame to be rendered
+    renderer: str, the renderer that will be used
+    xgen_files: [str], Xgen files already collected by the caller. If None,
+                Xgen collections will be scanned for files.
+
+  Returns:
+    [str], list of file paths, without duplicates
+  """
   generator = itertools.chain()
   # Generate asset paths
   if renderer == 'redshift':
@@ -740,34 +827,49 @@ def get_scene_files(frames_to_render, renderer):
       generator = itertools.chain(generator, generate_redshift_second_order_dependency_paths(frames_to_render))
 
   # Generate xgen paths
-  generator = itertools.chain(generator, generate_xgen_paths())
+  if xgen_files is None:
+    generator = itertools.chain(generator, generate_xgen_paths())
+  else:
+    generator = itertools.chain(generator, xgen_files)
 
   # Handle OCIO dependencies
   generator = itertools.chain(generator, generate_ocio_files())
-  return list(generator)
+
+  # The same file is often reported by more than one source, e.g. an Xgen
+  # archive also referenced by a file node. Return each file only once.
+  scene_files = []
+  found_files = set()
+  for scene_file in generator:
+    if scene_file not in found_files:
+      found_files.add(scene_file)
+      scene_files.append(scene_file)
+  return scene_files
 
 
 def generate_asset_paths(frames_to_render):
   """Returns all of the files being used by the scene"""
+  # Settings which don't change while the scene is scanned are looked up once
+  # here rather than by the handlers for every node.
+  project_dir = proj_dir()
   file_types = {
-    'file': _file_handler,
+    'file': functools.partial(_file_handler, _arnold_uses_tx_files()),
     'cacheFile': _cache_file_handler,
     'diskCache': _diskCache_handler,
     'VRayMesh': _vrmesh_handler,
     'mentalrayTexture': _mrtex_handler,
     'gpuCache': _gpu_handler,
-    'mentalrayOptions': _mrOptions_handler,
+    'mentalrayOptions': functools.partial(_mrOptions_handler, project_dir),
     'mentalrayIblShape': _mrIbl_handler,
     'AlembicNode': _abc_handler,
     'VRaySettingsNode': _vrSettings_handler,
-    'particle': _particle_handler,
+    'particle': functools.partial(_particle_handler, project_dir, cmds.file(q=True, loc=True)),
     'VRayLightIESShape': _ies_handler,
     'FurDescription': _fur_handler,
     'mib_ptex_lookup': _ptex_handler,
     'substance': _substance_handler,
     'imagePlane': _imagePlane_handler,
     'mesh': _mesh_handler,
-    'dynGlobals': _dynGlobals_handler,
+    'dynGlobals': functools.partial(_dynGlobals_handler, project_dir),
     'aiStandIn': _aiStandIn_handler,
     'aiImage': _aiImage_handler,
     'aiPhotometricLight': _aiPhotometricLight_handler,
@@ -792,15 +894,30 @@ def generate_asset_paths(frames_to_render):
     'bifrostContainer': functools.partial(_bifrost_handler, frames_to_render),
   }
 
-  for file_type in file_types:
-    handler = file_types.get(file_type)
-    nodes = cmds.ls(type=file_type)
-    for node in nodes:
-      for scene_file in handler(node):
-        if scene_file:
-          scene_file = scene_file.replace('\\', '/')
-          print 'found file dependency from %s node %s: %s' % (file_type, node, scene_file)
-          yield scene_file
+  # List nodes of all types in one query. ls also matches nodes of types
+  # derived from the ones requested, e.g. nParticle for particle, so map each
+  # reported type back to the requested types it inherits from.
+  nodes_and_types = cmds.ls(type=list(file_types), showType=True) or []
+  matching_file_types = {}
+  # Printing to the Script Editor refreshes it for every line, which adds up in
+  # scenes with thousands of dependencies. Print all of them at once instead.
+  found_messages = []
+  try:
+    for node, node_type in zip(nodes_and_types[0::2], nodes_and_types[1::2]):
+      if node_type not in matching_file_types:
+        inherited_types = cmds.nodeType(node_type, isTypeName=True, inherited=True) or [node_type]
+        matching_file_types[node_type] = [file_type for file_type in inherited_types
+                                          if file_type in file_types]
+      for file_type in matching_file_types[node_type]:
+        for scene_file in file_types[file_type](node):
+          if scene_file:
+            scene_file = scene_file.replace('\\', '/')
+            found_messages.append('found file dependency from %s node %s: %s' %
+                                  (file_type, node, scene_file))
+            yield scene_file
+  finally:
+    if found_messages:
+      print '\n'.join(found_messages)
 
 
 def generate_xgen_paths():
@@ -883,18 +1000,27 @@ def _get_xgen_collection_files(collection_name):
     obj_list = (xgenm.objects(collection_name, xg_desc) +
                 xgenm.fxModules(collection_name, xg_desc))
     for xg_obj in obj_list:
-      for xg_file in _get_xgen_object_files(collection_name, xg_desc, xg_obj):
+      for xg_file in _get_xgen_object_files(collection_name, xg_desc, xg_obj,
+                                            xg_proj_path):
         yield xg_file
 
 
-def _get_xgen_object_files(collection_name, desc_name, object_name):
-  """Get all files linked to an Xgen object."""
+def _get_xgen_object_files(collection_name, desc_name, object_name, xg_proj_path):
+  """Get all files linked to an Xgen object.
+
+  Args:
+    collection_name: str, name of the Xgen collection
+    desc_name: str, name of the description within the collection
+    object_name: str, name of the object within the description
+    xg_proj_path: str, xgProjectPath of the collection, used to resolve
+                  ${PROJECT} in file paths
+  """
   if _XGEN_IMPORT_ERROR:
     raise NameError('Xgen is not loaded due to error: %s' % _XGEN_IMPORT_ERROR)
   # the "files" attr requires some special parsing, handle this first
   if xgenm.attrExists('files', collection_name, desc_name, object_name):
     for file_path in _get_files_from_files_attr(collection_name, desc_name,
-                                                object_name):
+                                                object_name, xg_proj_path):
       yield file_path
   # look for other attributes which are expected to contain file paths
   for file_attr in _XGEN_FILE_ATTRS:
@@ -909,15 +1035,14 @@ def _get_xgen_object_files(collection_name, desc_name, object_name):
       yield other_attr_file
 
 
-def _get_files_from_files_attr(collection_name, desc_name, object_name):
+def _get_files_from_files_attr(collection_name, desc_name, object_name, xg_proj_path):
   """Get all files stored in the "files" attribute of an Xgen object."""
-  xg_proj_path = xgenm.getAttr('xgProjectPath', collection_name)
   # files attr has a rather strange format, which we must parse and attempt
   # to infer file paths from. For example:
   # #ArchiveGroup 0 name="stalagmite" thumbnail="stalagmite.png" description="No description." \
   #   materials="${PROJECT}/xgen/archives/materials/stalagmite.ma" color=[1.0,0.0,0.0]\n0 \
   #   "${PROJECT}/xgen/archives/abc/stalagmite.abc"
-  for attr in re.findall(r'(?:[^\s,"]|"(?:\\.|[^"])*")+',
+  for attr in _XGEN_FILES_ATTR_ITEM_RE.findall(
       xgenm.getAttr('files', collection_name, desc_name, object_name)):
     attr_split = attr.split('=')
     current_file = None
@@ -1029,7 +1154,54 @@ LAYER_INFO = {}
 def collect_layer_info(layer, renderer):
   cur_layer = cmds.editRenderLayerGlobals(q=True, currentRenderLayer=True)
   _switch_to_renderlayer(layer)
+  layer_info = _read_current_layer_info(renderer)
+  _switch_to_renderlayer(cur_layer)
+  return layer_info
+
+
+def collect_layers_info(layers, renderer):
+  """Collects info of several render layers into LAYER_INFO at once.
+
+  Each layer is visited once and the original layer is restored only at the
+  end, instead of switching back after every layer like collect_layer_info.
+
+  Args:
+    layers: [str], names of the layers to collect info of. Layers already in
+            LAYER_INFO are skipped.
+    renderer: str, the renderer that will be used
+  """
+  layers = [layer for layer in set(layers) if layer not in LAYER_INFO]
+  if not layers:
+    return
+  cur_layer = cmds.editRenderLayerGlobals(q=True, currentRenderLayer=True)
+  # Visit the current layer first, no switch is needed for it.
+  layers.sort(key=lambda layer: layer != cur_layer)
+  # Render element nodes are the same in every layer, only their enabled
+  # state can be overridden.
+  render_elements = None
+  if renderer == 'vray':
+    render_elements = _list_vray_render_elements()
+  try:
+    for layer in layers:
+      _switch_to_renderlayer(layer)
+      LAYER_INFO[layer] = _read_current_layer_info(renderer, render_elements)
+  finally:
+    _switch_to_renderlayer(cur_layer)
+
 
+def _list_vray_render_elements():
+  """Lists the V-Ray render element and render element set nodes."""
+  return cmds.ls(type=['VRayRenderElement', 'VRayRenderElementSet'])
+
+
+def _read_current_layer_info(renderer, render_elements=None):
+  """Reads the settings stored in LAYER_INFO from the current render layer.
+
+  Args:
+    renderer: str, the renderer that will be used
+    render_elements: [str], V-Ray render element nodes as returned by
+                     _list_vray_render_elements, listed if not given
+  """
   layer_info = {}
 
   # get list of active render passes
@@ -1037,9 +1209,9 @@ def collect_layer_info(layer, renderer):
   if (renderer == 'vray' and
     cmds.getAttr('vraySettings.imageFormatStr') != 'exr (multichannel)'
     and cmds.getAttr('vraySettings.relements_enableall') != False):
-    pass_list = cmds.ls(type='VRayRenderElement')
-    pass_list += cmds.ls(type='VRayRenderElementSet')
-    for r_pass in pass_list:
+    if render_elements is None:
+      render_elements = _list_vray_render_elements()
+    for r_pass in render_elements:
       if cmds.getAttr('%s.enabled' % (r_pass,)) == True:
         layer_info['render_passes'].append(r_pass)
   elif renderer == 'redshift':
@@ -1055,8 +1227,6 @@ def collect_layer_info(layer, renderer):
     layer_info['prefix'] = cmds.getAttr(NamePrefixAttributes.get_prefix(renderer))
   except Exception:
     layer_info['prefix'] = ''
-
-  _switch_to_renderlayer(cur_layer)
   return layer_info
 
 
@@ -1072,8 +1242,20 @@ def get_layer_override(layer, renderer, field):
   return LAYER_INFO[layer][field]
 
 
+# Maya version string, computed on the first get_maya_version call.
+_MAYA_VERSION = None
+
+
 def get_maya_version():
   """Returns the current major Maya version in use."""
+  global _MAYA_VERSION
+  if _MAYA_VERSION is None:
+    _MAYA_VERSION = _compute_maya_version()
+  return _MAYA_VERSION
+
+
+def _compute_maya_version():
+  """Computes the major Maya version returned by get_maya_version."""
   # `about -api` returns a value containing both major and minor
   # maya versions in one integer, e.g. 201515. Divide by 100 to
   # find the major version.
@@ -1093,7 +1275,8 @@ def get_maya_version():
   return str(version_rounded)
 
 
-def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_render):
+def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_render,
+                   upload_only=False):
   """Returns scene info for the current scene.
 
   Args:
@@ -1103,6 +1286,9 @@ def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_
     is_bake: bool, whether job is a bake job
     extra_assets: [str], list of any extra files to include
     frames_to_render: [int], list of each frame to be rendered
+    upload_only: bool, whether the job only uploads files. Render output
+                 settings such as render passes and AOVs are not collected
+                 or checked for such jobs.
 
   Returns:
     dict of scene information
@@ -1125,63 +1311,58 @@ def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_
       selected_layers = []
     selected_bake_sets = []
 
+  # Collect settings of all layers we need in one pass over the layers, rather
+  # than switching to each layer and back as its settings are first needed.
+  layers_to_collect = ['defaultRenderLayer'] + list(selected_layers)
+  if renderer == 'redshift':
+    layers_to_collect += scene_info['render_layers']
+  collect_layers_info(layers_to_collect, renderer)
+
   # Detect a list of referenced files. We must use ls() instead of file(q=True, r=True)
   # because the latter will only detect references one level down, not nested references.
   print '--> references'
   scene_info['references'] = []
   scene_info['unresolved_references'] = []
   for ref_node in cmds.ls(type='reference'):
+    # Skip bookkeeping reference nodes which have no file, rather than letting
+    # referenceQuery fail for them.
+    if ref_node in _NON_FILE_REFERENCE_NODES:
+      continue
     try:
-      scene_info['references'].append(cmds.referenceQuery(ref_node, filename=True))
-      scene_info['unresolved_references'].append(
-        cmds.referenceQuery(ref_node, filename=True, unresolvedName=True))
+      reference = cmds.referenceQuery(ref_node, filename=True)
+      unresolved_reference = cmds.referenceQuery(ref_node, filename=True, unresolvedName=True)
     except:
-      pass
+      continue
+    scene_info['references'].append(reference)
+    scene_info['unresolved_references'].append(unresolved_reference)
 
   print '--> render passes'
   scene_info['render_passes'] = {}
-  if renderer == 'vray' and cmds.getAttr('vraySettings.imageFormatStr') != 'exr (multichannel)':
-    pass_list = cmds.ls(type='VRayRenderElement')
-    pass_list += cmds.ls(type='VRayRenderElementSet')
+  if not upload_only and renderer == 'vray' and cmds.getAttr('vraySettings.imageFormatStr') != 'exr (multichannel)':
+    pass_list = _list_vray_render_elements()
     if len(pass_list) > 0:
+      # Element names are read from the current layer, the same for every
+      # layer, so each element's name only needs to be resolved once.
+      element_names = {}
       for layer in selected_layers:
         scene_info['render_passes'][layer] = []
-        enabled_passes = get_layer_override(layer, renderer, 'render_passes')
+        enabled_passes = set(get_layer_override(layer, renderer, 'render_passes'))
         for r_pass in pass_list:
           if r_pass in enabled_passes:
-            vray_name = None
-            vray_explicit_name = None
-            vray_file_name = None
-            for attr_name in cmds.listAttr(r_pass):
-              if attr_name.startswith('vray_filename'):
-                vray_file_name = cmds.getAttr('%s.%s' % (r_pass, attr_name))
-              elif attr_name.startswith('vray_name'):
-                vray_name = cmds.getAttr('%s.%s' % (r_pass, attr_name))
-              elif attr_name.startswith('vray_explicit_name'):
-                vray_explicit_name = cmds.getAttr('%s.%s' % (r_pass, attr_name))
-            if vray_file_name != None and vray_file_name != "":
-              final_name = vray_file_name
-            elif vray_explicit_name != None and vray_explicit_name != "":
-              final_name = vray_explicit_name
-            elif vray_name != None and vray_name != "":
-              final_name = vray_name
-            else:
-              continue
-            # special case for Material Select elements - these are named based on the material
-            # they are connected to.
-            if 'vray_mtl_mtlselect' in cmds.listAttr(r_pass):
-              connections = cmds.listConnections('%s.vray_mtl_mtlselect' % (r_pass,))
-              if connections:
-                final_name += '_%s' % (str(connections[0]),)
-            scene_info['render_passes'][layer].append(final_name)
+            if r_pass not in element_names:
+              element_names[r_pass] = _get_vray_render_element_name(r_pass)
+            final_name = element_names[r_pass]
+            if final_name:
+              scene_info['render_passes'][layer].append(final_name)
 
   print '--> bake sets'
   scene_info['bake_sets'] = {}
   for bake_set in selected_bake_sets:
+    baked_object = _get_bake_set_object(bake_set)
     scene_info['bake_sets'][bake_set] = {
-      'uvs': _get_bake_set_uvs(bake_set),
+      'uvs': _get_bake_set_uvs(baked_object),
       'map': _get_bake_set_map(bake_set),
-      'shape': _get_bake_set_shape(bake_set),
+      'shape': _get_bake_set_shape(baked_object),
       'output_path': _get_bake_set_output_path(bake_set),
     }
 
@@ -1239,8 +1420,11 @@ def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_
   scene_info['file_prefix'].append(layer_prefixes)
 
   print '--> files'
+  # Scanning Xgen collections walks their data directories on disk, so do it
+  # once and reuse the result for both file lists below.
+  xgen_files = list(get_xgen_files())
   assets = set()
-  for asset in get_scene_files(frames_to_render, renderer):
+  for asset in get_scene_files(frames_to_render, renderer, xgen_files):
     if asset:
       assets.add(_clean_path(asset))
   for asset in extra_assets:
@@ -1250,13 +1434,12 @@ def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_
   # Xgen files are already included in the main files list, but we also
   # include them separately so Zync can perform Xgen-related tasks on
   # the much smaller subset
-  scene_info['xgen_files'] = list(set(get_xgen_files()))
+  scene_info['xgen_files'] = list(set(xgen_files))
 
   print '--> plugins'
-  scene_info['plugins'] = []
+  # pluginInfo returns plugin names interleaved with their versions.
   plugin_list = cmds.pluginInfo(query=True, pluginsInUse=True)
-  for i in range(0, len(plugin_list), 2):
-    scene_info['plugins'].append(str(plugin_list[i]))
+  scene_info['plugins'] = [str(plugin) for plugin in plugin_list[0::2]]
 
   # detect MentalCore
   if renderer == 'mr':
@@ -1330,7 +1513,7 @@ def get_scene_info(renderer, layers_to_render, is_bake, extra_assets, frames_to_
       aov_on = False
       override_prefix = ''
     should_override_prefix = bool(override_prefix)
-    if aov_on:
+    if aov_on and not upload_only:
       print '--> AOVs'
       scene_info['aovs'] = [cmds.getAttr('%s.name' % (n,)) for n in cmds.ls(type='aiAOV')]
 
@@ -1419,39 +1602,79 @@ def _absolutize_path(path):
   return path
 
 
-def _get_bake_set_uvs(bake_set):
+def _get_vray_render_element_name(r_pass):
+  """Returns the name V-Ray uses in the file names of a render element.
+
+  Args:
+    r_pass: str, name of the VRayRenderElement or VRayRenderElementSet node
+
+  Returns:
+    str, the render element name, or None if the element has no name set
+  """
+  vray_name = None
+  vray_explicit_name = None
+  vray_file_name = None
+  # Let Maya filter the attributes, rather than listing all of them and
+  # checking each name here.
+  for attr_name in cmds.listAttr(r_pass, string=_VRAY_RENDER_ELEMENT_NAME_ATTRS) or []:
+    if attr_name.startswith('vray_filename'):
+      vray_file_name = cmds.getAttr('%s.%s' % (r_pass, attr_name))
+    elif attr_name.startswith('vray_name'):
+      vray_name = cmds.getAttr('%s.%s' % (r_pass, attr_name))
+    elif attr_name.startswith('vray_explicit_name'):
+      vray_explicit_name = cmds.getAttr('%s.%s' % (r_pass, attr_name))
+  if vray_file_name != None and vray_file_name != "":
+    final_name = vray_file_name
+  elif vray_explicit_name != None and vray_explicit_name != "":
+    final_name = vray_explicit_name
+  elif vray_name != None and vray_name != "":
+    final_name = vray_name
+  else:
+    return None
+  # special case for Material Select elements - these are named based on the material
+  # they are connected to.
+  if cmds.attributeQuery('vray_mtl_mtlselect', node=r_pass, exists=True):
+    connections = cmds.listConnections('%s.vray_mtl_mtlselect' % (r_pass,))
+    if connections:
+      final_name += '_%s' % (str(connections[0]),)
+  return final_name
+
+
+def _get_bake_set_object(bake_set):
+  """Returns the object a bake set is connected to, or None."""
   conn_list = cmds.listConnections(bake_set)
   if conn_list == None or len(conn_list) == 0:
     return None
-  return cmds.polyEvaluate(conn_list[0], b2=True)
+  return conn_list[0]
+
+
+def _get_bake_set_uvs(baked_object):
+  if baked_object is None:
+    return None
+  return cmds.polyEvaluate(baked_object, b2=True)
 
 
 def _get_bake_set_map(bake_set):
   return cmds.getAttr('%s.bakeChannel' % bake_set)
 
 
-def _get_bake_set_shape(bake_set):
-  transforms = cmds.listConnections(bake_set)
-  if transforms == None or len(transforms) == 0:
+def _get_bake_set_shape(baked_object):
+  if baked_object is None:
     return None
-  transform = transforms[0]
-  shape_nodes = cmds.listRelatives(transform)
+  shape_nodes = cmds.listRelatives(baked_object)
   if shape_nodes == None or len(shape_nodes) == 0:
     return None
   return shape_nodes[0]
 
 
 def _get_bake_set_output_path(bake_set):
-  out_path = cmds.getAttr('%s.outputTexturePath' % bake_set)
-  out_path = out_path.replace('\\', '/')
-  if out_path[0] == '/' or out_path[1] == ':':
-    full_path = out_path
-  else:
-    full_path = proj_dir().replace('\\', '/')
-    if full_path[-1] != '/':
-      full_path += '/'
-    full_path += out_path
-  return full_path
+  out_path = cmds.getAttr('%s.outputTexturePath' % bake_set).replace('\\', '/')
+  # Check for Windows drive letters explicitly, os.path.isabs only knows about
+  # paths of the platform Maya runs on. Slicing keeps this safe for empty or
+  # single character paths.
+  if out_path.startswith('/') or out_path[1:2] == ':':
+    return out_path
+  return '%s/%s' % (proj_dir().replace('\\', '/').rstrip('/'), out_path)
 
 
 def _get_vray_production_engine_name():
@@ -1474,6 +1697,10 @@ def _get_vray_production_engine_name():
 
 
 def _switch_to_renderlayer(layer_name):
+  # Switching layers re-applies all of the layer's overrides, which is slow in
+  # big scenes, so don't switch to the layer which is already current.
+  if cmds.editRenderLayerGlobals(q=True, currentRenderLayer=True) == layer_name:
+    return
   # Use the newer Render Setup API if it exists and Render Setup is enabled.
   if (_RENDERSETUP_IMPORT_ERROR is None and
       cmds.optionVar(exists='renderSetupEnable') and
@@ -1494,15 +1721,96 @@ def _switch_to_renderlayer(layer_name):
     cmds.editRenderLayerGlobals(currentRenderLayer=layer_name)
 
 
+@contextlib.contextmanager
+def _render_settings_restored(layer, attrs):
+  """Context manager for temporarily changing render settings of a layer.
+
+  Switches to the given render layer and records the values of the given
+  attributes. Yields a function taking an attribute and a value, which sets
+  the attribute only if it doesn't have that value already. On exit the
+  attributes set that way are set back to their recorded values and the
+  previously active render layer is restored. Undo recording is suspended
+  in the meantime, so the temporary changes don't end up in the user's undo
+  queue and don't have to be undone.
+
+  Args:
+    layer: str, name of the render layer to switch to
+    attrs: [str], attributes that may be changed, e.g.
+           'defaultRenderGlobals.animation'
+  """
+  undo_state = cmds.undoInfo(query=True, state=True)
+  cmds.undoInfo(stateWithoutFlush=False)
+  current_layer = cmds.editRenderLayerGlobals(q=True, currentRenderLayer=True)
+  try:
+    _switch_to_renderlayer(layer)
+    # Values are read within the layer, so restoring them doesn't replace any
+    # layer overrides with values from another layer.
+    original_values = dict((attr, cmds.getAttr(attr)) for attr in attrs)
+    current_values = dict(original_values)
+    changed_attrs = []
+
+    def set_attr(attr, value):
+      # Setting an attribute dirties everything downstream of it in the DG,
+      # skip values which are already set.
+      if current_values[attr] == value:
+        return
+      _set_attr(attr, value)
+      current_values[attr] = value
+      if attr not in changed_attrs:
+        changed_attrs.append(attr)
+
+    try:
+      yield set_attr
+    finally:
+      for attr in changed_attrs:
+        _set_attr(attr, original_values[attr])
+  finally:
+    _switch_to_renderlayer(current_layer)
+    cmds.undoInfo(stateWithoutFlush=undo_state)
+
+
+def _set_attr(attr, value):
+  """Sets an attribute, strings are set as string attributes.
+
+  Args:
+    attr: str, node.attribute to set
+    value: the value to set. None sets a string attribute to an empty string,
+           unset string attributes are read as None.
+  """
+  if value is None or isinstance(value, basestring):
+    cmds.setAttr(attr, value or '', type='string')
+  else:
+    cmds.setAttr(attr, value)
+
+
+def _attr_exists(node, attr):
+  """Whether a node exists and has the given attribute.
+
+  Checking up front is cheaper than calling getAttr and catching the error
+  raised for a missing node or attribute.
+
+  Args:
+    node: str, name of the Maya node
+    attr: str, name of the attribute
+
+  Returns:
+    bool, True if node.attr exists
+  """
+  return bool(cmds.objExists(node) and
+              cmds.attributeQuery(attr, node=node, exists=True))
+
+
 def _maya_attr_is_true(attr_val):
   """Whether a Maya attr evaluates to True.
 
   When querying an attribute value from an ambiguous object the Maya API will return
   a list of values, which need to be properly handled to evaluate properly.
   """
-  if isinstance(attr_val, types.BooleanType):
+  # Most attributes come back as plain booleans, check for those first.
+  if attr_val is True or attr_val is False:
     return attr_val
   elif isinstance(attr_val, (types.ListType, types.GeneratorType)):
+    # any() stops at the first true value without consuming the rest.
     return any(attr_val)
   else:
     return bool(attr_val)
@@ -1532,10 +1840,12 @@ def _parse_frame_range_section(frange_section):
   if range_match:
     start_frame = int(range_match.group('sf'))
     end_frame = int(range_match.group('ef'))
+    # parse_frame_range copies these into its own list, xrange avoids building
+    # a temporary list for each section.
     if end_frame >= start_frame:
-      return range(start_frame, end_frame+1)
+      return xrange(start_frame, end_frame+1)
     else:
-      return range(start_frame, end_frame-1, -1)
+      return xrange(start_frame, end_frame-1, -1)
 
   single_frame_match = _SINGLE_FRAME_RE.match(frange_section)
   if single_frame_match:
@@ -1646,6 +1956,9 @@ class SubmitWindow(object):
 
     self.vray_production_engine_name = VRAY_ENGINE_NAME_UNKNOWN
 
+    # EULA list fetched from Zync, see _get_eulas().
+    self._eulas = None
+
     self.new_project_name = self.zync_conn.get_project_name(scene_name)
 
     self.num_instances = 1
@@ -1657,7 +1970,9 @@ class SubmitWindow(object):
       self.project = self.project[:-1]
 
     self.frange = frame_range()
-    self.udim_range = udim_range()
+    # Evaluating UV bounds of baked meshes is slow, only do it when a bake job
+    # is selected.
+    self._udim_range = None
     self.frame_step = cmds.getAttr('defaultRenderGlobals.byFrameStep')
     self.chunk_size = 10
     self.upload_only = 0
@@ -1911,20 +2226,18 @@ class SubmitWindow(object):
     elif job_type == 'bake':
       cmds.textField('output_dir', e=True, en=False)
       cmds.text('frange_label', e=True, label='UDIM Range:')
-      cmds.textField('frange', e=True, tx=self.udim_range)
+      cmds.textField('frange', e=True, tx=self._get_udim_range())
       cmds.optionMenu('camera', e=True, en=False)
       cmds.text('layers_label', e=True, label='Bake Sets:')
       cmds.textScrollList('layers', e=True, removeAll=True)
       cmds.textScrollList('layers', e=True, append=self.bake_sets)
-      try:
+      default_x_res = ''
+      if _attr_exists('vrayDefaultBakeOptions', 'resolutionX'):
         default_x_res = str(cmds.getAttr('vrayDefaultBakeOptions.resolutionX'))
-      except:
-        default_x_res = ''
       cmds.textField('x_res', e=True, tx=default_x_res)
-      try:
+      default_y_res = ''
+      if _attr_exists('vrayDefaultBakeOptions', 'resolutionY'):
         default_y_res = str(cmds.getAttr('vrayDefaultBakeOptions.resolutionY'))
-      except:
-        default_y_res = ''
       cmds.textField('y_res', e=True, tx=default_y_res)
     else:
       cmds.error('Unknown Job Type "%s".' % (job_type,))
@@ -2095,6 +2408,17 @@ class SubmitWindow(object):
     """
     cmds.showWindow(self.name)
 
+  def _get_udim_range(self):
+    """Get the UDIM range of the scene's bake sets, computing it only on
+    first use.
+
+    Returns:
+      str, UDIM range as returned by udim_range()
+    """
+    if self._udim_range is None:
+      self._udim_range = udim_range()
+    return self._udim_range
+
   def init_bake(self):
     self.bake_sets = (bake_set for bake_set in cmds.ls(type='VRayBakeOptions') \
       if bake_set != 'vrayDefaultBakeOptions')
@@ -2112,12 +2436,10 @@ class SubmitWindow(object):
 
   def init_existing_project_name(self):
     self.projects = self.zync_conn.get_project_list()
-    project_found = False
-    for project in self.projects:
-      cmds.menuItem(parent='existing_project_name', label=project['name'])
-      if project['name'] == self.new_project_name:
-        project_found = True
-    if project_found:
+    project_names = [project['name'] for project in self.projects]
+    for project_name in project_names:
+      cmds.menuItem(parent='existing_project_name', label=project_name)
+    if self.new_project_name in project_names:
       cmds.optionMenu('existing_project_name', e=True, v=self.new_project_name)
     if len(self.projects) == 0:
       cmds.radioButton('existing_project', e=True, en=False)
@@ -2175,7 +2497,11 @@ class SubmitWindow(object):
       self.vray_production_engine_name = _get_vray_production_engine_name()
 
   def init_renderer(self):
-    #  Add the list of renderers to UI element.
+    #  Add the list of renderers to UI element. Remove any items left from
+    #  a previous call first so the menu doesn't fill up with duplicates.
+    old_renderers = cmds.optionMenu('renderer', q=True, ill=True)
+    if old_renderers is not None:
+      cmds.deleteUI(old_renderers)
     rend_found = False
     default_renderer_name = RENDERER_NAMES.get(self.renderer, 'vray')
 
@@ -2194,13 +2520,22 @@ class SubmitWindow(object):
     self.job_types = self.zync_conn.JOB_SUBTYPES['maya']
 
   def init_camera(self):
-    cam_parents = [cmds.listRelatives(x, ap=True)[-1] for x in cmds.ls(cameras=True)]
+    cameras = cmds.ls(cameras=True)
+    # Look up the parents of all cameras with a single query rather than one
+    # per camera, one parent per camera shape. listRelatives returns None when
+    # there's nothing to list.
+    cam_parents = (cmds.listRelatives(cameras, parent=True) or []) if cameras else []
+    seen_parents = set()
     for cam in cam_parents:
+      # Several camera shapes may be under one transform, only list it once.
+      if cam in seen_parents:
+        continue
+      seen_parents.add(cam)
       # Only show renderable cameras, but look at render layer overrides to see
       # if cameras are set to renderable in other layers.
       if (_maya_attr_is_true(cmds.getAttr(cam + '.renderable')) or
-          any([_maya_attr_is_true(override)
-               for override in _get_layer_overrides('%s.renderable' % cam)])):
+          any(_maya_attr_is_true(override)
+              for override in _get_layer_overrides('%s.renderable' % cam))):
         cmds.menuItem(parent='camera', label=cam)
 
   def init_output_dir(self):
@@ -2246,13 +2581,7 @@ class SubmitWindow(object):
       str, the currently selected renderer, or None if we weren't
       able to identify the one selected.
     """
-    selected_renderer_label = eval_ui('renderer', ui_type='optionMenu', v=True)
-    for renderer, renderer_label in RENDERER_NAMES.iteritems():
-      if renderer_label == selected_renderer_label:
-        return renderer
-    if selected_renderer_label == RENDER_LABEL_VRAY_CUDA:
-      return 'vray'
-    return None
+    return _RENDERERS_BY_LABEL.get(eval_ui('renderer', ui_type='optionMenu', v=True))
 
   def set_user_label(self, username):
     cmds.text('google_login_status', e=True, label='Logged in as %s' % username)
@@ -2315,9 +2644,11 @@ class SubmitWindow(object):
     self.verify_vray_production_engine()
 
     print 'Exporting .vrscene files...'
+    scene_path = cmds.file(q=True, loc=True)
     for layer in layer_list:
       print 'Exporting layer %s...' % layer
-      vrscene_path = self.get_standalone_scene_path('vrscene', layer=layer)
+      vrscene_path = self.get_standalone_scene_path('vrscene', layer=layer,
+                                                    scene_path=scene_path)
       possible_scene_names, render_params = self.export_vrscene(
         vrscene_path, layer, params, sf, ef)
 
@@ -2428,9 +2759,10 @@ class SubmitWindow(object):
     try:
       params['scene_info'] = get_scene_info(params['renderer'],
           layers_to_render,
-          (eval_ui('job_type', ui_type='optionMenu', v=True).lower() == 'bake'),
+          params['job_subtype'] == 'bake',
           extra_assets if params['sync_extra_assets'] else [],
-          parse_frame_range(params['frange']))
+          parse_frame_range(params['frange']),
+          upload_only=(params['upload_only'] == 1))
     except maya_common.ZyncAbortedByUser:
       # If the job is aborted just finish the submit function
       return
@@ -2532,107 +2864,100 @@ class SubmitWindow(object):
         - dict of render job parameters, with any modifications to make the
           job run similarly with Vray standalone.
     """
-    cmds.undoInfo(openChunk=True)
-
-    _switch_to_renderlayer(layer)
-
-    scene_path = cmds.file(q=True, loc=True)
-    scene_head, extension = os.path.splitext(scene_path)
-    scene_name = os.path.basename(scene_head)
-
-    render_params = copy.deepcopy(params)
-
-    print '--> bake GI flag'
-    render_params['scene_info']['bake_gi'] = False
-    try:
-      if cmds.getAttr('vraySettings.gi'):
-        primary_engine = int(cmds.getAttr('vraySettings.pe'))
-        secondary_engine = int(cmds.getAttr('vraySettings.se'))
-        _NONE_RENDERER_ID = 0
-        _BRUTE_FORCE_RENDERER_ID = 2
-        render_params['scene_info']['bake_gi'] = primary_engine != _BRUTE_FORCE_RENDERER_ID or \
-                                (secondary_engine != _NONE_RENDERER_ID and secondary_engine != _BRUTE_FORCE_RENDERER_ID)
-    except:
-        pass
-
-    render_params['scene_info']['render_layers'] = [layer]
-    render_params['project_dir'] = params['project']
-    render_params['output_dir'] = params['out_path']
-    render_params['use_nightly'] = params['vray_nightly']
-    if ('extension' not in params['scene_info'] or
-        params['scene_info']['extension'] == None or
-        params['scene_info']['extension'].strip() == ''):
-      render_params['scene_info']['extension'] = 'png'
-
-    tail = cmds.getAttr(NamePrefixAttributes.vray)
-    if not tail:
-      tail = scene_name
-      if len(params['layers'].split(',')) > 1:
-        tail += '_{}'.format(layer)
-    else:
-      clean_camera = render_params['camera'].replace(':', '_')
-      tail = replace_tokens_in_file_prefix(tail, scene_name, layer, clean_camera)
-    if tail[-1] != '.':
-      tail += '.'
-
-    render_params['output_filename'] = '%s.%s' % (tail, render_params['scene_info']['extension'])
-    render_params['output_filename'] = render_params['output_filename'].replace('\\', '/')
-
-    # Set up render globals for vray export. These changes will
-    # be reverted later when we run cmds.undo().
-    #
-    # Turn "Don't save image" OFF - this will ensure Vray knows to translate
-    # all render output settings.
-    cmds.setAttr('vraySettings.dontSaveImage', 0)
-    # Turn rendering off.
-    cmds.setAttr('vraySettings.vrscene_render_on', 0)
-    # Turn Vrscene export on.
-    cmds.setAttr('vraySettings.vrscene_on', 1)
-    # Set the Vrscene export filename.
-    cmds.setAttr('vraySettings.vrscene_filename', vrscene_path, type='string')
-    # Ensure we export only a single file.
-    cmds.setAttr('vraySettings.misc_separateFiles', 0)
-    cmds.setAttr('vraySettings.misc_eachFrameInFile', 0)
-
+    # Render globals changed for the vray export, restored once it's done.
+    export_settings = [
+      # Turn "Don't save image" OFF - this will ensure Vray knows to translate
+      # all render output settings.
+      ('vraySettings.dontSaveImage', 0),
+      # Turn rendering off.
+      ('vraySettings.vrscene_render_on', 0),
+      # Turn Vrscene export on.
+      ('vraySettings.vrscene_on', 1),
+      # Set the Vrscene export filename.
+      ('vraySettings.vrscene_filename', vrscene_path),
+      # Ensure we export only a single file.
+      ('vraySettings.misc_separateFiles', 0),
+      ('vraySettings.misc_eachFrameInFile', 0),
+    ]
     # Turn off Geom Cache. If you render a frame locally with this on, and then
     # immediately export to zync, the cached geometry is written to the file.
     # Any geo that has deformations are only rendered in the cached state and
     # not updated per frame. This is an issue with Vray and using 'vrend' instead
     # of BatchRender to export the vrscene.
-    try:
-      cmds.setAttr('vraySettings.globopt_cache_geom_plugins', 0)
-      cmds.setAttr('vraySettings.globopt_cache_bitmaps', 0)
-    # older versions of Vray do not have these settings. if they don't exist a
-    # RuntimeError will be raised, which we can ignore.
-    except RuntimeError:
-      pass
+    # Older versions of Vray do not have these settings, skip any that don't
+    # exist.
+    for cache_attr in ('globopt_cache_geom_plugins', 'globopt_cache_bitmaps'):
+      if cmds.attributeQuery(cache_attr, node='vraySettings', exists=True):
+        export_settings.append(('vraySettings.%s' % cache_attr, 0))
+    export_settings += [
+      # Set compression options.
+      ('vraySettings.misc_meshAsHex', 1),
+      ('vraySettings.misc_transformAsHex', 1),
+      ('vraySettings.misc_compressedVrscene', 1),
+      # Turn the VFB off, make sure the viewer is hidden.
+      ('vraySettings.vfbOn', 0),
+      ('vraySettings.hideRVOn', 1),
+      # Ensure animation is fully enabled and configured with the correct
+      # frame range. This is usually the case already, but some users will
+      # have it disabled expecting their existing local farm to update
+      # with the correct settings.
+      ('vraySettings.animBatchOnly', 0),
+      ('defaultRenderGlobals.animation', 1),
+      ('defaultRenderGlobals.startFrame', start_frame),
+      ('defaultRenderGlobals.endFrame', end_frame),
+      # Set resolution of the scene to layer resolution to avoid problems with regions.
+      ('vraySettings.width', params['xres']),
+      ('vraySettings.height', params['yres']),
+    ]
+    export_attrs = [attr for attr, _ in export_settings]
+    with _render_settings_restored(layer, export_attrs) as set_attr:
+      scene_path = cmds.file(q=True, loc=True)
+      scene_head, extension = os.path.splitext(scene_path)
+      scene_name = os.path.basename(scene_head)
+
+      # Only top level values and scene_info values are changed below, nested
+      # lists are shared with params.
+      render_params = dict(params)
+      render_params['scene_info'] = dict(params['scene_info'])
+
+      print '--> bake GI flag'
+      render_params['scene_info']['bake_gi'] = False
+      try:
+        if cmds.getAttr('vraySettings.gi'):
+          primary_engine = int(cmds.getAttr('vraySettings.pe'))
+          secondary_engine = int(cmds.getAttr('vraySettings.se'))
+          _NONE_RENDERER_ID = 0
+          _BRUTE_FORCE_RENDERER_ID = 2
+          render_params['scene_info']['bake_gi'] = primary_engine != _BRUTE_FORCE_RENDERER_ID or \
+                                  (secondary_engine != _NONE_RENDERER_ID and secondary_engine != _BRUTE_FORCE_RENDERER_ID)
+      except:
+          pass
 
-    # Set compression options.
-    cmds.setAttr('vraySettings.misc_meshAsHex', 1)
-    cmds.setAttr('vraySettings.misc_transformAsHex', 1)
-    cmds.setAttr('vraySettings.misc_compressedVrscene', 1)
-    # Turn the VFB off, make sure the viewer is hidden.
-    cmds.setAttr('vraySettings.vfbOn', 0)
-    cmds.setAttr('vraySettings.hideRVOn', 1)
-    # Ensure animation is fully enabled and configured with the correct
-    # frame range. This is usually the case already, but some users will
-    # have it disabled expecting their existing local farm to update
-    # with the correct settings.
-    cmds.setAttr('vraySettings.animBatchOnly', 0)
-    cmds.setAttr('defaultRenderGlobals.animation', 1)
-    cmds.setAttr('defaultRenderGlobals.startFrame', start_frame)
-    cmds.setAttr('defaultRenderGlobals.endFrame', end_frame)
-    # Set resolution of the scene to layer resolution to avoid problems with regions.
-    cmds.setAttr('vraySettings.width', render_params['xres'])
-    cmds.setAttr('vraySettings.height', render_params['yres'])
-
-    # Run the export.
-    maya.mel.eval('vrend -camera "%s" -layer "%s"' % (render_params['camera'], layer))
-
-    queue_empty = cmds.undoInfo(query=True, undoQueueEmpty=True)
-    cmds.undoInfo(closeChunk=True)
-    if not queue_empty:
-      cmds.undo()
+      render_params['scene_info']['render_layers'] = [layer]
+      render_params['project_dir'] = params['project']
+      render_params['output_dir'] = params['out_path']
+      render_params['use_nightly'] = params['vray_nightly']
+      if ('extension' not in params['scene_info'] or
+          params['scene_info']['extension'] == None or
+          params['scene_info']['extension'].strip() == ''):
+        render_params['scene_info']['extension'] = 'png'
+
+      tail = cmds.getAttr(NamePrefixAttributes.vray)
+      if not tail:
+        tail = scene_name
+        if len(params['layers'].split(',')) > 1:
+          tail += '_{}'.format(layer)
+      else:
+        clean_camera = render_params['camera'].replace(':', '_')
+        tail = replace_tokens_in_file_prefix(tail, scene_name, layer, clean_camera)
+      render_params['output_filename'] = get_standalone_output_filename(
+          tail, render_params['scene_info']['extension'])
+
+      for attr, value in export_settings:
+        set_attr(attr, value)
+
+      # Run the export.
+      maya.mel.eval('vrend -camera "%s" -layer "%s"' % (render_params['camera'], layer))
 
     vrscene_base, ext = os.path.splitext(vrscene_path)
     if layer == 'defaultRenderLayer':
@@ -2671,68 +2996,58 @@ class SubmitWindow(object):
         - dict of render job parameters, with any modifications to make the
           job run similarly with Arnold standalone.
     """
-    cmds.undoInfo(openChunk=True)
-
-    _switch_to_renderlayer(layer)
-
-    # We need to remove 'rs_' prefix from layer name,
-    # as it is removed by Arnold during standalone rendering.
-    if layer.startswith('rs_'):
-      layer = layer[3:]
+    # Render settings changed for the export, restored once it's done.
+    export_attrs = ('defaultRenderGlobals.putFrameBeforeExt',
+                    'defaultRenderGlobals.periodInExt')
+    with _render_settings_restored(layer, export_attrs) as set_attr:
+      # We need to remove 'rs_' prefix from layer name,
+      # as it is removed by Arnold during standalone rendering.
+      if layer.startswith('rs_'):
+        layer = layer[3:]
 
-    scene_path = cmds.file(q=True, loc=True)
-    scene_head, extension = os.path.splitext(scene_path)
-    scene_name = os.path.basename(scene_head)
+      scene_path = cmds.file(q=True, loc=True)
+      scene_head, extension = os.path.splitext(scene_path)
+      scene_name = os.path.basename(scene_head)
 
-    render_params = copy.deepcopy(params)
+      # Only top level values are changed below.
+      render_params = dict(params)
 
-    render_params['project_dir'] = params['project']
-    render_params['output_dir'] = params['out_path']
+      render_params['project_dir'] = params['project']
+      render_params['output_dir'] = params['out_path']
 
-    tail = cmds.getAttr(NamePrefixAttributes.arnold)
-    if not tail:
-      tail = scene_name
-      if len(params['layers'].split(',')) > 1:
-        tail += '_{}'.format(layer)
-    else:
-      clean_camera = params['camera'].replace(':', '_')
-      tail = replace_tokens_in_file_prefix(tail, scene_name, layer, clean_camera)
-      try:
-        render_version = cmds.getAttr('defaultRenderGlobals.renderVersion')
-        if render_version != None:
-          tail = re.sub('%v|<version>',
-            cmds.getAttr('defaultRenderGlobals.renderVersion'),
-            tail, flags=re.IGNORECASE)
-      except ValueError:
-        pass
-    if tail[-1] != '.':
-      tail += '.'
-
-    render_params['output_filename'] = '%s.%s' % (tail, params['scene_info']['extension'])
-    render_params['output_filename'] = render_params['output_filename'].replace('\\', '/')
-
-    ass_base, ext = os.path.splitext(ass_path)
-    layer_mangled = base64.b64encode(layer)[-4:]
-    layer_file = '%s_%s_%s%s' % (ass_base, layer, layer_mangled, ext)
-    layer_file_wildcard = '%s_%s*%s' % (ass_base, layer, ext)
-
-    # Override renderSetup options to keep exported *.ass files names consistent
-    # with what backend expects (filename.framenumber.ext), see b/128825029
-    maya.cmds.setAttr('defaultRenderGlobals.putFrameBeforeExt', 1)
-    maya.cmds.setAttr('defaultRenderGlobals.periodInExt', 1)
-    ass_cmd = ('arnoldExportAss -f "%s" -endFrame %s -mask 255 ' % (layer_file, end_frame) +
-      '-lightLinks 1 -frameStep %d.0 -startFrame %s ' % (render_params['step'], start_frame) +
-      '-shadowLinks 1 -cam %s' % (params['camera'],))
-    maya.mel.eval(ass_cmd)
-
-    queue_empty = cmds.undoInfo(query=True, undoQueueEmpty=True)
-    cmds.undoInfo(closeChunk=True)
-    if not queue_empty:
-      cmds.undo()
+      tail = cmds.getAttr(NamePrefixAttributes.arnold)
+      if not tail:
+        tail = scene_name
+        if len(params['layers'].split(',')) > 1:
+          tail += '_{}'.format(layer)
+      else:
+        clean_camera = params['camera'].replace(':', '_')
+        try:
+          render_version = cmds.getAttr('defaultRenderGlobals.renderVersion')
+        except ValueError:
+          render_version = None
+        tail = replace_tokens_in_file_prefix(tail, scene_name, layer, clean_camera,
+                                             render_version)
+      render_params['output_filename'] = get_standalone_output_filename(
+          tail, params['scene_info']['extension'])
+
+      ass_base, ext = os.path.splitext(ass_path)
+      layer_mangled = base64.b64encode(layer)[-4:]
+      layer_file = '%s_%s_%s%s' % (ass_base, layer, layer_mangled, ext)
+      layer_file_wildcard = '%s_%s*%s' % (ass_base, layer, ext)
+
+      # Override renderSetup options to keep exported *.ass files names consistent
+      # with what backend expects (filename.framenumber.ext), see b/128825029
+      set_attr('defaultRenderGlobals.putFrameBeforeExt', 1)
+      set_attr('defaultRenderGlobals.periodInExt', 1)
+      ass_cmd = ('arnoldExportAss -f "%s" -endFrame %s -mask 255 ' % (layer_file, end_frame) +
+        '-lightLinks 1 -frameStep %d.0 -startFrame %s ' % (render_params['step'], start_frame) +
+        '-shadowLinks 1 -cam %s' % (params['camera'],))
+      maya.mel.eval(ass_cmd)
 
     return layer_file_wildcard, render_params
 
-  def get_standalone_scene_path(self, suffix, layer=None):
+  def get_standalone_scene_path(self, suffix, layer=None, scene_path=None):
     """Get a file path for exporting a standalone scene, based on current scene
     and matching the Zync convention of where these files should be stored.
 
@@ -2742,11 +3057,14 @@ class SubmitWindow(object):
     Args:
       suffix: str, the suffix of the filename e.g. "vrscene" or "ass"
       layer: str, the layer name to append to the file path
+      scene_path: str, path of the current scene, queried from Maya if not
+                  given
 
     Returns:
       str the standalone scene file path
     """
-    scene_path = cmds.file(q=True, loc=True)
+    if scene_path is None:
+      scene_path = cmds.file(q=True, loc=True)
     scene_head, _ = os.path.splitext(scene_path)
     if layer is not None:
       scene_head += '_%s' % layer
@@ -2765,23 +3083,22 @@ class SubmitWindow(object):
     applicable_eula_types = ['zync', 'cloud', 'licensor']
     if is_mayaio_job:
       applicable_eula_types.append('mayaio')
-    to_accept = [eula for eula in self.zync_conn.get_eulas()
-                 if eula.get('eula_kind').lower() in applicable_eula_types]
+    if self._is_eula_acceptance_recorded(applicable_eula_types):
+      return True
+    applicable_eula_kinds = set(applicable_eula_types)
+    to_accept = [eula for eula in self._get_eulas()
+                 if (eula.get('eula_kind') or '').lower() in applicable_eula_kinds]
     # Blank accepted_by field indicates agreement is not yet accepted.
     not_accepted = [eula for eula in to_accept if not eula.get('accepted_by')]
     if not_accepted:
       eula_url = '%s/account#legal' % self.zync_conn.url
-      cmds.confirmDialog(
-          title='Accept Agreement',
-          message=(
-              'Please read and accept the required EULA(s) and Terms of Service(s). '
-              'A browser window will open where you can do this.\n\nURL: %s' % eula_url),
-          button=['OK'],
-          defaultButton='OK')
-      webbrowser.open(eula_url)
+      webbrowser.open_new_tab(eula_url)
       eula_response = cmds.confirmDialog(
           title='Accept Agreement',
-          message='Have you accepted all agreements?',
+          message=(
+              'Please read and accept the required EULA(s) and Terms of Service(s) '
+              'in the browser window that has been opened.\n\nURL: %s\n\n'
+              'Have you accepted all agreements?' % eula_url),
           button=['Yes', 'No'],
           defaultButton='Yes',
           cancelButton='No',
@@ -2789,55 +3106,221 @@ class SubmitWindow(object):
 
       if eula_response == 'No':
         return False
+      # The user may have accepted agreements in the meantime, fetch the list
+      # again on the next check.
+      self._eulas = None
+    else:
+      self._record_eula_acceptance(applicable_eula_types)
 
     return True
 
+  def _is_eula_acceptance_recorded(self, eula_types):
+    """Whether Zync recently confirmed the current user accepted the given
+    EULA types on the current Zync site.
+
+    Args:
+      eula_types: [str], EULA kinds which need to be accepted
+
+    Returns:
+      bool, True if acceptance of all eula_types was recorded less than
+      _EULA_ACCEPTANCE_CACHE_TTL ago
+    """
+    recorded = _read_cached_result(_EULA_ACCEPTANCE_CACHE_FILE, _EULA_ACCEPTANCE_CACHE_TTL)
+    return bool(recorded and
+                recorded.get('url') == self.zync_conn.url and
+                recorded.get('email') == self.zync_conn.email and
+                set(eula_types).issubset(recorded.get('eula_types') or []))
+
+  def _record_eula_acceptance(self, eula_types):
+    """Records that Zync confirmed the current user accepted the given EULA
+    types.
+
+    Only acceptance confirmed by Zync is recorded. When the user has just
+    gone through the acceptance flow, acceptance is verified with Zync on the
+    next submission.
+
+    Args:
+      eula_types: [str], EULA kinds which have been accepted
+    """
+    error = _write_cached_result(
+        _EULA_ACCEPTANCE_CACHE_FILE,
+        {'url': self.zync_conn.url, 'email': self.zync_conn.email,
+         'eula_types': eula_types})
+    if error:
+      print error
+
+  def _get_eulas(self):
+    """Get the list of EULAs from Zync, fetching it only on first use.
+
+    Returns:
+      [dict], EULAs as returned by zync_conn.get_eulas()
+    """
+    if self._eulas is None:
+      self._eulas = self.zync_conn.get_eulas()
+    return self._eulas
+
 
 @show_exceptions
 def submit_dialog():
   submit_window = SubmitWindow()
   submit_window.show()
-  # show update notification last so it gets focus
-  if not is_latest_version():
+  # Check for updates in the background so opening the window doesn't wait on
+  # the network. The update notification is shown last so it gets focus.
+  version_check = threading.Thread(target=_notify_if_update_available)
+  version_check.daemon = True
+  version_check.start()
+
+
+def _notify_if_update_available():
+  """Shows the update notification if a newer plugin version is available.
+
+  Meant to be run in a background thread. Maya UI and output may only be used
+  from the main thread, so only the check itself is run here and reporting
+  its result is deferred to the main thread.
+  """
+  is_latest, messages = _check_latest_version()
+  maya.utils.executeDeferred(
+      functools.partial(_report_version_check, is_latest, messages))
+
+
+def _report_version_check(is_latest, messages):
+  """Prints the messages of a version check and notifies about updates.
+
+  Args:
+    is_latest: bool, whether the plugin is the latest version
+    messages: [str], messages returned by _check_latest_version
+  """
+  for message in messages:
+    print message
+  if not is_latest:
     show_update_notification()
 
 
-def is_latest_version():
+def _check_latest_version():
+  """Checks whether the plugin is the latest version.
+
+  Nothing is printed, so the check can be run in a background thread.
+
+  Returns:
+    tuple:
+      - bool, whether the plugin is the latest version
+      - [str], messages to print about problems with the check
+  """
   global _VERSION_CHECK_RESULT
+  messages = []
+  if _VERSION_CHECK_RESULT is None:
+    cached = _read_cached_result(_VERSION_CHECK_CACHE_FILE, _VERSION_CHECK_CACHE_TTL)
+    if cached and cached.get('version') == __version__:
+      _VERSION_CHECK_RESULT = bool(cached.get('is_latest'))
   if _VERSION_CHECK_RESULT is None:
     try:
       import_zync_python()
       _VERSION_CHECK_RESULT = zync.is_latest_version([('zync_maya', __version__)])
-    # if there's an exception during version check, print the exception but
+    # if there's an exception during version check, report the exception but
     # assume user is up to date. we don't want to block them launching jobs.
     except:
-      print 'Exception checking version number'
-      print traceback.format_exc()
-      return True
-  return _VERSION_CHECK_RESULT
+      messages.append('Exception checking version number')
+      messages.append(traceback.format_exc())
+      return True, messages
+    error = _write_cached_result(_VERSION_CHECK_CACHE_FILE,
+                                 {'version': __version__, 'is_latest': _VERSION_CHECK_RESULT})
+    if error:
+      messages.append(error)
+  return _VERSION_CHECK_RESULT, messages
+
+
+def _read_cached_result(cache_file, ttl):
+  """Reads a result stored on disk by _write_cached_result.
+
+  Args:
+    cache_file: str, path of the file the result was stored in
+    ttl: int, maximum age of the result in seconds
+
+  Returns:
+    dict, the stored result, or None if there is no readable result younger
+    than ttl.
+  """
+  try:
+    with open(cache_file) as fp:
+      cached = json.load(fp)
+    if 0 <= time.time() - cached['timestamp'] < ttl:
+      return cached
+  except (IOError, ValueError, KeyError, TypeError):
+    pass
+  return None
+
+
+def _write_cached_result(cache_file, result):
+  """Stores a result on disk together with the current time.
+
+  Failing to store the result is not an error, it only means the work will
+  be repeated next time.
+
+  Args:
+    cache_file: str, path of the file to store the result in
+    result: dict, JSON-serializable result to store
+
+  Returns:
+    str, message describing why the result couldn't be stored, or None if it
+    was stored
+  """
+  try:
+    cache_dir = os.path.dirname(cache_file)
+    if not os.path.isdir(cache_dir):
+      os.makedirs(cache_dir)
+    with open(cache_file, 'w') as fp:
+      json.dump(dict(result, timestamp=time.time()), fp)
+  except (IOError, OSError) as e:
+    return 'Unable to write %s: %s' % (cache_file, e)
+  return None
 
 
-def replace_tokens_in_file_prefix(file_prefix, scene_name, layer, camera):
+def replace_tokens_in_file_prefix(file_prefix, scene_name, layer, camera, version=None):
   """
   Replace various tokens in the file output prefix with values from the scene.
 
+  All tokens are replaced in a single pass, so token-like text in the
+  substituted values is left alone.
+
   Args:
     file_prefix: str, string containing tokens to be replaced.
     scene_name: str, name of scene file to replace _SUBSTITUTE_SCENE_TOKEN_RE.
     layer: str, name of layer to replace _SUBSTITUTE_LAYER_TOKEN_RE.
     camera: str, name of camera to replace _SUBSTITUTE_CAMERA_TOKEN_RE.
+    version: str, render version to replace %v and <version> with. If None,
+             version tokens are left in place.
 
   Returns:
       str, token replaced file prefix.
   """
-  mappings = (
-    (maya_common._SUBSTITUTE_SCENE_TOKEN_RE, scene_name),
-    (maya_common._SUBSTITUTE_LAYER_TOKEN_RE, layer),
-    (maya_common._SUBSTITUTE_CAMERA_TOKEN_RE, camera),
-  )
-  for regex, value in mappings:
-    file_prefix = re.sub(regex, value, file_prefix)
-  return file_prefix
+  # Every token starts with either '%' or '<', prefixes without them are
+  # returned as they are.
+  if '%' not in file_prefix and '<' not in file_prefix:
+    return file_prefix
+
+  values = {'scene': scene_name, 'layer': layer, 'camera': camera, 'version': version}
+
+  def _replacement(match):
+    value = values[match.lastgroup]
+    return match.group(0) if value is None else value
+
+  return maya_common._SUBSTITUTE_FILE_PREFIX_TOKEN_RE.sub(_replacement, file_prefix)
+
+
+def get_standalone_output_filename(tail, extension):
+  """
+  Build the output filename of a standalone render job.
+
+  Args:
+      tail: str, output file prefix, with tokens already replaced.
+      extension: str, image file extension.
+
+  Returns:
+      str, output filename using forward slashes.
+  """
+  if not tail.endswith('.'):
+    tail += '.'
+  return ('%s.%s' % (tail, extension)).replace('\\', '/')
 
 
 def output_has_layer_problems(renderer, layer_list):
@@ -2854,12 +3337,16 @@ def output_has_layer_problems(renderer, layer_list):
       bool, True if outputs are problematic False if outputs are safe
   """
   try:
-    output_prefix = cmds.getAttr(NamePrefixAttributes.get_prefix(renderer))
+    prefix_attr = NamePrefixAttributes.get_prefix(renderer)
   except AttributeError:
     raise maya_common.MayaZyncException('Renderer %s unsupported for rendering.' % renderer)
+  # A single layer can't overwrite output of other layers, no need to query the prefix.
+  if len(layer_list) < 2:
+    return False
+  output_prefix = cmds.getAttr(prefix_attr)
   if output_prefix is None:
     return False
-  return len(layer_list) > 1 and not re.match(maya_common._HAS_LAYER_TOKEN_RE, output_prefix)
+  return not maya_common._HAS_LAYER_TOKEN_RE.match(output_prefix)
 
 
 def show_update_notification():
@@ -13,33 +13,49 @@ import unittest
 import zync_maya
 import maya_common
 
+# maya.cmds and maya.mel modules, imported once Maya standalone is initialized.
+_MAYA_MODULES = None
+
+# Plugins loaded by default in newer Maya versions which no test needs. Their
+# scene callbacks make every new scene noticeably slower, so they're unloaded
+# before running the tests.
+_UNNEEDED_PLUGINS = ('LookdevXMaya',)
+
+
+def setUpModule():
+  """
+  Import the maya api modules and initialize standalone, once for all tests in this module.
+  """
+  global _MAYA_MODULES
+  if _MAYA_MODULES is None:
+    import maya.standalone
+    maya.standalone.initialize()
+    import maya.cmds
+    import maya.mel
+    for plugin in _UNNEEDED_PLUGINS:
+      if maya.cmds.pluginInfo(plugin, query=True, loaded=True):
+        maya.cmds.unloadPlugin(plugin, force=True)
+    _MAYA_MODULES = (maya.cmds, maya.mel)
+
 
 class TestMayaScene(unittest.TestCase):
   """Scene-based tests, acting on an individual scene which must be provided."""
   scene_file = None
   info_file = None
-  maya_cmds = None
-  maya_mel = None
 
   def setUp(self):
     """
-    Import the maya api modules and initialize standalone if not already done. Ensure each test starts with a new file.
+    Ensure each test starts with a new file.
     """
-    if self.maya_cmds is None:
-      import maya.standalone
-      maya.standalone.initialize()
-      import maya.cmds
-      import maya.mel
-      self.maya_cmds = maya.cmds
-      self.maya_mel = maya.mel
+    self.maya_cmds, self.maya_mel = _MAYA_MODULES
     self.maya_cmds.file(f=True, new=True)
 
   def test_scene_info(self):
     if self.scene_file is None:
       raise unittest.SkipTest('scene_file is required to run this test.')
     with open(self.info_file) as fp:
-      params = json.loads(fp.read())['params']
-    scene_info_master = _unicode_to_str(params['scene_info'])
+      params = json.load(fp, object_hook=_str_object_hook)['params']
+    scene_info_master = params['scene_info']
     zync_maya.renderman.init(params['layers'].split(','), params['camera'])
 
     # Assume the structure is <project folder>/scenes/<scene file>.
@@ -161,6 +177,14 @@ class TestMaya(unittest.TestCase):
     self.assertEqual(
         zync_maya.extract_frame_number_from_file_path('/path/to/file_07.0283.exr'), 283)
 
+  def test_seq_to_glob(self):
+    self.assertEqual(zync_maya.seq_to_glob('/path/to/file.1001.exr'), '/path/to/file.*.exr')
+    self.assertEqual(zync_maya.seq_to_glob('/path/to/tex12_v3.0042.tif'), '/path/to/tex12_v3.*.tif')
+    self.assertEqual(zync_maya.seq_to_glob('/path/to/file.####.exr'), '/path/to/file.*.exr')
+    self.assertEqual(zync_maya.seq_to_glob('/path/to/texture.<UDIM>.tif'), '/path/to/texture.*.tif')
+    self.assertEqual(zync_maya.seq_to_glob('/path/to2/file.exr'), '/path/to2/file.exr')
+    self.assertEqual(zync_maya.seq_to_glob(None), None)
+
   def test_submission_check(self):
     check = lambda: True
     true_check = zync_maya.SubmissionCheck(check=check, title='True check')
@@ -197,6 +221,22 @@ class TestMaya(unittest.TestCase):
     expected = 'camera_scene_layer'
     self.assertEqual(zync_maya.replace_tokens_in_file_prefix(input, scene_name, layer, camera), expected)
 
+    input = '<scene>_%l_<version>'
+    expected = 'scene_layer_v002'
+    self.assertEqual(
+        zync_maya.replace_tokens_in_file_prefix(input, 'scene', 'layer', 'camera', 'v002'), expected)
+    expected = 'scene_layer_<version>'
+    self.assertEqual(
+        zync_maya.replace_tokens_in_file_prefix(input, 'scene', 'layer', 'camera'), expected)
+
+  def test_get_standalone_output_filename(self):
+    self.assertEqual(zync_maya.get_standalone_output_filename('images/scene', 'exr'),
+                     'images/scene..exr')
+    self.assertEqual(zync_maya.get_standalone_output_filename('images/scene.', 'exr'),
+                     'images/scene..exr')
+    self.assertEqual(zync_maya.get_standalone_output_filename('images\\scene', 'png'),
+                     'images/scene..png')
+
   def test_replace_frame_number(self):
     test_input = "text_without_tokens.png"
     expected = "text_without_tokens.png"
@@ -215,22 +255,70 @@ class TestMaya(unittest.TestCase):
       zync_maya.replace_frame_number(test_input, -1)
 
 
+def _str_object_hook(json_obj):
+  """json.load object_hook which replaces unicode keys and values with
+  standard strings as each object is decoded.
+
+  json.load gives us unicode values, converting them while parsing saves a
+  second pass over the decoded object.
+
+  Args:
+    json_obj: dict, a decoded JSON object. Nested objects have already been
+              passed through this hook.
+  """
+  return {_encode_json_value(key): _encode_json_value(value)
+          for key, value in json_obj.iteritems()}
+
+
+def _encode_json_value(value):
+  if isinstance(value, unicode):
+    return value.encode('utf-8')
+  elif isinstance(value, list):
+    return [_encode_json_value(element) for element in value]
+  return value
+
+
 def _unicode_to_str(input_obj):
   """Returns a version of the input with all unicode replaced by standard
   strings.
 
-  json.loads gives us unicode values, this method helps us clean that for
-  easier comparison.
+  The Maya API gives us unicode values, this method helps us clean that for
+  easier comparison. Nested dicts and lists are walked with an explicit stack
+  rather than recursion, so deeply nested input can't hit the recursion limit.
 
   Args:
     input_obj: whatever input you want to convert - dict, list, str, etc. will
-               recurse into that object to convert all unicode values
+               descend into that object to convert all unicode values
   """
+  result = _shallow_unicode_to_str(input_obj)
+  # Pairs of (input container, output container still to be filled in).
+  pending = []
+  if isinstance(input_obj, (dict, list)):
+    pending.append((input_obj, result))
+  while pending:
+    source, target = pending.pop()
+    if isinstance(source, dict):
+      items = source.iteritems()
+    else:
+      items = enumerate(source)
+    for key, value in items:
+      converted = _shallow_unicode_to_str(value)
+      if isinstance(source, dict):
+        target[_shallow_unicode_to_str(key)] = converted
+      else:
+        target.append(converted)
+      if isinstance(value, (dict, list)):
+        pending.append((value, converted))
+  return result
+
+
+def _shallow_unicode_to_str(input_obj):
+  """Converts a single value for _unicode_to_str. Dicts and lists are
+  replaced by empty containers of the same type, to be filled in later."""
   if isinstance(input_obj, dict):
-    return {_unicode_to_str(key): _unicode_to_str(value)
-            for key, value in input_obj.iteritems()}
+    return {}
   elif isinstance(input_obj, list):
-    return [_unicode_to_str(element) for element in input_obj]
+    return []
   elif isinstance(input_obj, unicode):
     return input_obj.encode('utf-8')
   else: